@@ -1,27 +1,76 @@
 """Importa os módulos necessários para o funcionamento do chatbot.
 
 Módulos importados:
+- io: Módulo usado para percorrer em memória arquivos de conversa já lidos por inteiro.
+- os: Módulo para operações do sistema de arquivos.
 - re: Módulo para operações com expressões regulares.
-- pickle: Módulo para serialização e desserialização de objetos Python.
+- time: Módulo para medir o intervalo entre atualizações da resposta.
+- pickle: Módulo para serialização e desserialização de objetos Python. A implementação
+em C (_pickle) é exigida, para não cair silenciosamente na versão em Python puro.
+- pickletools: Módulo usado para remover do pickle as entradas de memo não utilizadas.
+- hashlib: Módulo usado para gerar a chave do cache de respostas.
+- concurrent.futures.ThreadPoolExecutor: Executor usado para gravar as conversas em segundo plano.
+- collections.OrderedDict: Dicionário ordenado usado como cache LRU das respostas.
+- functools.lru_cache: Decorador para memoização de funções.
 - pathlib.Path: Classe para manipulação de caminhos de arquivos e diretórios.
-- unidecode: Função para remover acentos de caracteres Unicode.
-- openai: Módulo para interação com a API da OpenAI.
+- msgpack: Módulo para serialização binária das conversas salvas.
 - streamlit: Módulo para criação de aplicativos web interativos.
 
+Os módulos `openai` (interação com a API da OpenAI) e `unidecode` (remoção de
+acentos) são importados dentro das funções que os usam, para não atrasar a
+inicialização do aplicativo.
+
 """
+import io
+import os
 import re
+import time
 import pickle
+import pickletools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from functools import lru_cache
 from pathlib import Path
-from unidecode import unidecode
-import openai
+import msgpack
 import streamlit as st
 
+try:
+    import _pickle  # noqa: F401
+except ImportError as erro:
+    raise ImportError(
+        "O acelerador em C do pickle (_pickle) não está disponível nesta instalação do Python."
+    ) from erro
 
 PASTA_CONFIGURACOES = Path(__file__).parent / 'configuracoes'
 PASTA_CONFIGURACOES.mkdir(exist_ok=True)
 PASTA_MENSAGENS = Path(__file__).parent / 'mensagens'
 PASTA_MENSAGENS.mkdir(exist_ok=True)
+ARQUIVO_INDICE = PASTA_CONFIGURACOES / 'index.pkl'
 CACHE_DESCONVERTE = {}
+# Primeiro byte dos arquivos de conversa em msgpack; arquivos legados em pickle começam com b'\x80'
+MAGICO_MSGPACK = b'M'
+_NON_ALNUM = re.compile(r'\W+')
+# Intervalo mínimo, em segundos, entre redesenhos da resposta em stream (~15 por segundo)
+INTERVALO_ATUALIZACAO = 0.066
+# Quantidade máxima de respostas guardadas no cache de cada sessão
+TAMANHO_CACHE_RESPOSTAS = 64
+
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def cliente_openai(api_key):
+    """
+    Retorna um cliente da OpenAI para a chave fornecida, reaproveitado entre turnos.
+
+    Args:
+        api_key (str): A chave da API para a OpenAI.
+
+    Returns:
+        openai.OpenAI: O cliente, com seu pool de conexões já configurado.
+    """
+    import openai
+
+    return openai.OpenAI(api_key=api_key)
 
 
 def chat_openai(api_key, mensagens, modelo='gpt-3.5-turbo', temperatura=0.5, stream=False):
@@ -43,8 +92,7 @@ def chat_openai(api_key, mensagens, modelo='gpt-3.5-turbo', temperatura=0.5, str
     Returns:
         openai.ChatCompletion: O objeto de resposta da API.
     """
-    client = openai.OpenAI(api_key=api_key)
-    response = client.chat.completions.create(
+    response = cliente_openai(api_key).chat.completions.create(
         model=modelo,
         messages=mensagens,
         temperature=temperatura,
@@ -69,7 +117,7 @@ def salva_chave(chave):
     """
     try:
         with open(PASTA_CONFIGURACOES / 'chave', 'wb') as f:
-            pickle.dump(chave, f)
+            f.write(pickletools.optimize(pickle.dumps(chave, protocol=pickle.HIGHEST_PROTOCOL)))
             print("Chave salva com sucesso")
     except (OSError, pickle.PicklingError) as e:
         print(f"Erro ao salvar a chave: {e}")
@@ -82,13 +130,57 @@ def le_chave():
     Returns:
         str: A chave lida do arquivo, ou uma string vazia se o arquivo não existir.
     """
-    if (PASTA_CONFIGURACOES / 'chave').exists():
+    try:
         with open(PASTA_CONFIGURACOES / 'chave', 'rb') as f:
             return pickle.load(f)
-    else:
+    except FileNotFoundError:
         return ''
 
 
+def le_indice():
+    """
+    Lê o índice que associa o nome de cada arquivo de conversa ao nome da mensagem.
+
+    Returns:
+        dict: O índice {nome_arquivo: nome_mensagem}, ou um dicionário vazio
+        se o arquivo não existir ou não puder ser lido.
+    """
+    try:
+        with open(ARQUIVO_INDICE, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return {}
+
+
+def salva_indice(indice):
+    """
+    Salva o índice de conversas na pasta de configurações.
+
+    Assim como as conversas, o índice é escrito em um arquivo temporário que
+    depois substitui o original com `os.replace`.
+
+    Args:
+        indice (dict): O índice {nome_arquivo: nome_mensagem} a ser salvo.
+
+    Returns:
+        None
+    """
+    caminho_temporario = ARQUIVO_INDICE.with_suffix('.tmp')
+    try:
+        with open(caminho_temporario, 'wb') as f:
+            f.write(pickletools.optimize(pickle.dumps(indice, protocol=pickle.HIGHEST_PROTOCOL)))
+        os.replace(caminho_temporario, ARQUIVO_INDICE)
+    except (OSError, pickle.PicklingError) as e:
+        print(f"Erro ao salvar o índice de conversas: {e}")
+        caminho_temporario.unlink(missing_ok=True)
+
+
+# Sob `streamlit run` este cache é praticamente inerte: o script é reexecutado a
+# cada interação, o que recria o cache, e em cada execução o nome é convertido
+# no máximo uma vez (`pagina_principal` o calcula e o repassa a `salvar_mensagens`).
+# Ele é mantido porque não custa nada e evita recálculos quando as funções do
+# módulo são usadas fora do Streamlit, por exemplo importadas em um script.
+@lru_cache(maxsize=512)
 def converte_nome_mensagem(nome_mensagem):
     """Converte o nome da mensagem para um formato adequado para o nome do arquivo.
 
@@ -106,11 +198,16 @@ def converte_nome_mensagem(nome_mensagem):
     if not nome_mensagem:
         raise ValueError("O nome da mensagem não pode ser vazio.")
 
-    # Remove acentos usando unidecode
-    nome_arquivo = unidecode(nome_mensagem)
+    # Remove acentos usando unidecode; textos já em ASCII não precisam de transliteração
+    if nome_mensagem.isascii():
+        nome_arquivo = nome_mensagem
+    else:
+        from unidecode import unidecode
+
+        nome_arquivo = unidecode(nome_mensagem)
 
     # Remove todos os caracteres não alfanuméricos (incluindo espaços) e converte para minúsculas
-    nome_arquivo = re.sub(r'\W+', '', nome_arquivo).lower()
+    nome_arquivo = _NON_ALNUM.sub('', nome_arquivo).lower()
 
     return nome_arquivo
 
@@ -134,48 +231,287 @@ def retorna_nome_da_mensagem(mensagens):
     return nome_mensagem
 
 
-def salvar_mensagens(mensagens):
+@st.cache_resource(show_spinner=False)
+def escritor_arquivos():
+    """
+    Retorna o executor que grava os arquivos de conversa fora da thread da interface.
+
+    Um único worker é compartilhado por todas as sessões, o que preserva a ordem
+    das gravações: um turno nunca é acrescentado antes da criação do arquivo.
+
+    Returns:
+        ThreadPoolExecutor: O executor com um único worker.
+    """
+    return ThreadPoolExecutor(max_workers=1)
+
+
+def aguarda_gravacoes():
+    """
+    Bloqueia até que todas as gravações agendadas até aqui tenham terminado.
+
+    Deve ser chamada antes de ler do disco algo que acabou de ser salvo.
+    """
+    escritor_arquivos().submit(lambda: None).result()
+
+
+def grava_conversa(caminho_arquivo, cabecalho, mensagens):
+    """
+    Grava a conversa inteira de forma atômica e atualiza o índice de conversas.
+
+    O conteúdo é escrito em um arquivo temporário que depois substitui o original
+    com `os.replace`, de modo que uma gravação interrompida nunca deixa o arquivo
+    da conversa pela metade.
+
+    Args:
+        - caminho_arquivo (Path): O caminho do arquivo da conversa.
+        - cabecalho (dict): O cabeçalho com 'nome_mensagem' e 'nome_arquivo'.
+        - mensagens (list): Lista de dicionários contendo as mensagens.
+
+    Returns:
+        bool: True se a conversa foi gravada com sucesso, False caso contrário.
+    """
+    caminho_temporario = caminho_arquivo.with_suffix('.tmp')
+    try:
+        with open(caminho_temporario, 'wb') as f:
+            f.write(MAGICO_MSGPACK)
+            f.write(msgpack.packb(cabecalho, use_bin_type=True))
+            f.write(msgpack.packb({'mensagem': mensagens}, use_bin_type=True))
+        os.replace(caminho_temporario, caminho_arquivo)
+        # print(f"Mensagem salva com sucesso em {caminho_arquivo}")
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Erro ao salvar a mensagem: {e}")
+        caminho_temporario.unlink(missing_ok=True)
+        return False
+
+    # Regravar um arquivo existente não altera a data da pasta, chave do cache da listagem
+    escaneia_conversas.clear()
+
+    indice = le_indice()
+    if indice.get(cabecalho['nome_arquivo']) != cabecalho['nome_mensagem']:
+        indice[cabecalho['nome_arquivo']] = cabecalho['nome_mensagem']
+        salva_indice(indice)
+    return True
+
+
+def grava_turno(caminho_arquivo, mensagens_turno, mensagens=None):
+    """
+    Acrescenta as mensagens de um turno ao final de um arquivo de conversa existente.
+
+    Se a escrita falhar, o arquivo é truncado de volta ao tamanho anterior, para
+    que um registro pela metade não fique antes dos turnos seguintes. Arquivos
+    legados em pickle são convertidos para msgpack, regravando a conversa inteira.
+    Se o arquivo não existir (por exemplo, porque a primeira gravação falhou), a
+    conversa é regravada por inteiro a partir de `mensagens`.
+
+    Args:
+        - caminho_arquivo (Path): O caminho do arquivo da conversa.
+        - mensagens_turno (list): As mensagens do turno (pergunta e resposta).
+        - mensagens (list, optional): O histórico completo, incluindo o turno.
+
+    Returns:
+        bool: True se o turno foi gravado com sucesso, False caso contrário.
+    """
+    try:
+        registro = msgpack.packb({'mensagem': mensagens_turno}, use_bin_type=True)
+        with open(caminho_arquivo, 'r+b') as f:
+            legado = f.read(1) != MAGICO_MSGPACK
+            if not legado:
+                tamanho = f.seek(0, os.SEEK_END)
+                try:
+                    f.write(registro)
+                    f.flush()
+                except OSError:
+                    f.truncate(tamanho)
+                    raise
+    except FileNotFoundError as e:
+        if not mensagens:
+            print(f"Erro ao salvar a mensagem: {e}")
+            return False
+        cabecalho = {
+            'nome_mensagem': retorna_nome_da_mensagem(mensagens),
+            'nome_arquivo': caminho_arquivo.name,
+        }
+        return grava_conversa(caminho_arquivo, cabecalho, mensagens)
+    except (OSError, TypeError, ValueError) as e:
+        print(f"Erro ao salvar a mensagem: {e}")
+        return False
+
+    if legado:
+        try:
+            conteudo_mensagens = carrega_registros(caminho_arquivo)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError) as e:
+            print(f"Erro ao converter o arquivo legado: {e}")
+            return False
+        mensagens = conteudo_mensagens.pop('mensagem') + mensagens_turno
+        return grava_conversa(caminho_arquivo, conteudo_mensagens, mensagens)
+
+    # Acrescentar ao arquivo não altera a data da pasta, chave do cache da listagem
+    escaneia_conversas.clear()
+    return True
+
+
+def salvar_mensagens(mensagens, nome_mensagem=None, nome_arquivo=None):
     """Salva o histórico das mensagens.
 
+    A gravação é feita em segundo plano por `escritor_arquivos`; a função
+    retorna assim que ela é agendada.
+
     Args:
-        mensagens (list): Lista de dicionários contendo as mensagens.
+        - mensagens (list): Lista de dicionários contendo as mensagens.
+        - nome_mensagem (str, optional): O nome da conversa, se já conhecido.
+        - nome_arquivo (str, optional): O nome do arquivo da conversa, se já conhecido.
+        Quando os dois são informados, a lista não é percorrida para calculá-los.
 
     Returns:
-        bool: True se a mensagem foi salva com sucesso, False caso contrário.
+        bool: True se a gravação foi agendada, False se não há o que salvar
+        ou se o nome da conversa não gera um nome de arquivo válido.
     """
     if not mensagens:
         print("Nenhuma mensagem para salvar.")
         return False
 
-    nome_mensagem = retorna_nome_da_mensagem(mensagens)
-    if not nome_mensagem:
-        print("Nenhuma mensagem de usuário encontrada.")
+    if not (nome_mensagem and nome_arquivo):
+        nome_mensagem = retorna_nome_da_mensagem(mensagens)
+        if not nome_mensagem:
+            print("Nenhuma mensagem de usuário encontrada.")
+            return False
+        nome_arquivo = converte_nome_mensagem(nome_mensagem)
+
+    # Sem caracteres alfanuméricos o nome do arquivo fica vazio e apontaria para a própria pasta
+    if not nome_arquivo:
+        print("O nome da mensagem não gera um nome de arquivo válido.")
         return False
 
-    nome_arquivo = converte_nome_mensagem(nome_mensagem)
-    arquivo_salvar = {
+    cabecalho = {
         'nome_mensagem': nome_mensagem,
         'nome_arquivo': nome_arquivo,
-        'mensagem': mensagens
     }
 
     # Certifica-se de que a pasta de mensagens existe
     PASTA_MENSAGENS.mkdir(parents=True, exist_ok=True)
 
-    caminho_arquivo = PASTA_MENSAGENS / nome_arquivo
+    # Copia a lista, que continua sendo alterada na sessão enquanto o worker grava
+    escritor_arquivos().submit(grava_conversa, PASTA_MENSAGENS / nome_arquivo,
+                               cabecalho, list(mensagens))
+
+    CACHE_DESCONVERTE[nome_arquivo] = nome_mensagem
+    return True
+
+
+def acrescentar_turno(nome_arquivo, mensagens_turno, mensagens=None):
+    """Acrescenta apenas as mensagens de um novo turno ao final do arquivo da conversa.
+
+    Diferente de `salvar_mensagens`, não regrava o histórico inteiro: o custo de
+    cada turno depende só do tamanho das mensagens novas. Arquivos legados em
+    pickle são convertidos para msgpack na primeira gravação. Assim como em
+    `salvar_mensagens`, a gravação é feita em segundo plano.
+
+    Args:
+        - nome_arquivo (str): O nome do arquivo da conversa, já existente.
+        - mensagens_turno (list): As mensagens do turno (pergunta e resposta).
+        - mensagens (list, optional): O histórico completo, incluindo o turno. Usado
+        para regravar a conversa caso o arquivo não exista, em vez de perder o turno.
+
+    Returns:
+        bool: True se a gravação foi agendada.
+    """
+    escritor_arquivos().submit(grava_turno, PASTA_MENSAGENS / nome_arquivo,
+                               list(mensagens_turno), list(mensagens or []))
+    return True
+
+
+def le_registros(f):
+    """
+    Gera, em ordem, os registros de um arquivo de mensagens aberto em modo binário.
+
+    Args:
+        f: O arquivo de mensagens, posicionado no início.
+
+    Yields:
+        dict: Cada registro gravado no arquivo, seja em msgpack ou no formato pickle legado.
+    """
+    if f.read(1) == MAGICO_MSGPACK:
+        yield from msgpack.Unpacker(f, raw=False)
+        return
+
+    # Arquivo legado, gravado com pickle
+    f.seek(0)
+    while True:
+        try:
+            yield pickle.load(f)
+        except EOFError:
+            return
+
+
+def registro_valido(registro):
+    """
+    Indica se um registro de turno lido do arquivo tem o formato esperado.
+
+    Args:
+        registro: O objeto decodificado do arquivo.
+
+    Returns:
+        bool: True se for um dicionário com uma lista de mensagens em 'mensagem'.
+    """
+    return (isinstance(registro, dict)
+            and isinstance(registro.get('mensagem'), list)
+            and all(isinstance(mensagem, dict) for mensagem in registro['mensagem']))
+
+
+def carrega_registros(caminho_arquivo):
+    """
+    Lê todos os registros de um arquivo de mensagens e reconstrói a conversa.
+
+    O primeiro registro é o cabeçalho com 'nome_mensagem' e 'nome_arquivo'; os
+    seguintes trazem, na chave 'mensagem', as mensagens acrescentadas a cada turno.
+    Arquivos antigos, gravados em um único registro, continuam sendo lidos.
+    A leitura para no primeiro registro inválido ou incompleto, como o deixado
+    por uma gravação interrompida: o que vem depois dele não é confiável.
+
+    O arquivo é lido de uma só vez e os registros são decodificados em memória,
+    em vez de várias leituras pequenas no disco durante a desserialização.
+
+    Args:
+        caminho_arquivo (Path): O caminho do arquivo de mensagens.
+
+    Returns:
+        dict: O cabeçalho da conversa com a lista completa de mensagens em 'mensagem'.
+    """
+    dados = caminho_arquivo.read_bytes()
+    registros = le_registros(io.BytesIO(dados))
+    conteudo_mensagens = next(registros, {})
+    conteudo_mensagens.setdefault('mensagem', [])
     try:
-        with open(caminho_arquivo, 'wb') as f:
-            pickle.dump(arquivo_salvar, f)
-        # print(f"Mensagem salva com sucesso em {caminho_arquivo}")
-        return True
-    except (OSError, pickle.PicklingError) as e:
-        print(f"Erro ao salvar a mensagem: {e}")
-        return False
+        for registro in registros:
+            if not registro_valido(registro):
+                break
+            conteudo_mensagens['mensagem'].extend(registro['mensagem'])
+    except (ValueError, pickle.UnpicklingError) as e:
+        print(f"Registros corrompidos ignorados em {caminho_arquivo}: {e}")
+    return conteudo_mensagens
+
+
+def le_cabecalho(nome_arquivo):
+    """
+    Lê apenas o cabeçalho de um arquivo de conversa, sem carregar as mensagens.
+
+    Em arquivos msgpack o cabeçalho é o primeiro registro, então somente o início
+    do arquivo é lido. Arquivos legados em pickle guardam tudo em um único
+    registro e precisam ser lidos por inteiro.
+
+    Args:
+        nome_arquivo (str): O nome do arquivo da conversa.
+
+    Returns:
+        dict: O cabeçalho, com as chaves 'nome_mensagem' e 'nome_arquivo'.
+    """
+    with open(PASTA_MENSAGENS / nome_arquivo, 'rb') as f:
+        return next(le_registros(f), {})
 
 
 def ler_mensagem_por_nome_arquivo(nome_arquivo, key='mensagem'):
     """
-    Função que lê um arquivo de mensagens em formato pickle e retorna
+    Função que lê um arquivo de mensagens e retorna
     o conteúdo associado à chave especificada.
 
     Args:
@@ -186,8 +522,7 @@ def ler_mensagem_por_nome_arquivo(nome_arquivo, key='mensagem'):
     Returns:
         object: O conteúdo associado à chave especificada no arquivo de mensagens.
     """
-    with open(PASTA_MENSAGENS / nome_arquivo, 'rb') as f:
-        conteudo_mensagens = pickle.load(f)
+    conteudo_mensagens = carrega_registros(PASTA_MENSAGENS / nome_arquivo)
     return conteudo_mensagens[key]
 
 
@@ -203,50 +538,29 @@ def desconverte_nome_mensagem(nome_arquivo):
         str: O nome da mensagem associada ao arquivo.
     """
     if nome_arquivo not in CACHE_DESCONVERTE:
-        nome_mensagem = ler_mensagem_por_nome_arquivo(nome_arquivo, key='nome_mensagem')
+        nome_mensagem = le_cabecalho(nome_arquivo)['nome_mensagem']
         CACHE_DESCONVERTE[nome_arquivo] = nome_mensagem
     return CACHE_DESCONVERTE[nome_arquivo]
 
 
-def ler_mensagens(mensagens, key='mensagem'):
+@st.cache_data(show_spinner=False)
+def escaneia_conversas(mtime_ns):
     """
-    Função que lê o conteúdo de mensagens de um arquivo pickle com base
-    no nome da mensagem fornecido.
+    Lista os arquivos da pasta de mensagens, do mais recente para o mais antigo.
 
     Args:
-        - mensagens (list): Lista de mensagens.
-        - key (str, optional): A chave associada ao conteúdo desejado no arquivo.
-        Por padrão é 'mensagem'.
+        mtime_ns (int): A data de modificação da pasta de mensagens. Serve apenas
+        como chave do cache, para que a pasta só seja varrida de novo quando mudar.
 
     Returns:
-        object: O conteúdo associado à chave especificada no arquivo de mensagens.
-
-    Raises:
-        FileNotFoundError: Se o arquivo especificado não for encontrado.
-        pickle.UnpicklingError: Se ocorrer um erro ao processar o arquivo pickle.
-        KeyError: Se a chave especificada não for encontrada no arquivo de mensagens.
+        list: Os nomes dos arquivos de conversa ordenados por data de modificação.
     """
-    if not mensagens:
-        return []
-
-    nome_mensagem = retorna_nome_da_mensagem(mensagens)
-    if not nome_mensagem:
-        return []
-
-    nome_arquivo = converte_nome_mensagem(nome_mensagem)
-    caminho_arquivo = PASTA_MENSAGENS / nome_arquivo
-
-    try:
-        with open(caminho_arquivo, 'rb') as f:
-            conteudo_mensagens = pickle.load(f)
-    except (FileNotFoundError, pickle.UnpicklingError) as e:
-        print(f"Erro ao abrir ou processar o arquivo: {e}")
-        return []
-
-    if key not in conteudo_mensagens:
-        raise KeyError(f"Chave '{key}' não encontrada no arquivo de mensagens.")
-
-    return conteudo_mensagens[key]
+    with os.scandir(PASTA_MENSAGENS) as entradas:
+        # Arquivos .tmp são gravações de grava_conversa ainda em andamento
+        conversas = [(e.name, e.stat().st_mtime_ns) for e in entradas
+                     if e.is_file() and not e.name.endswith('.tmp')]
+    conversas.sort(key=lambda item: item[1], reverse=True)
+    return [nome for nome, _ in conversas]
 
 
 def listar_conversas():
@@ -254,12 +568,47 @@ def listar_conversas():
     Função que lista as conversas disponíveis na pasta de mensagens,
     ordenadas por data de modificação.
 
+    Os nomes das mensagens vêm do índice de conversas, lido uma única vez;
+    apenas conversas ausentes do índice têm o arquivo aberto, e são então
+    acrescentadas a ele.
+
+    Não espera as gravações em segundo plano. Na execução que cria uma conversa,
+    ela aparece no topo mesmo que o arquivo ainda esteja na fila, com o nome
+    guardado em CACHE_DESCONVERTE por `salvar_mensagens`. Esse cache é recriado
+    a cada execução do script, então em uma execução seguinte, antes de o worker
+    terminar, a conversa some da lista até o arquivo ser gravado.
+
+    Returns:
+        list: Lista de tuplas (nome_arquivo, nome_mensagem) ordenadas por data de modificação.
+    """
+    conversas = escaneia_conversas(PASTA_MENSAGENS.stat().st_mtime_ns)
+    conversa_atual = st.session_state.get('conversa_atual')
+    if (conversa_atual and conversa_atual not in conversas
+            and conversa_atual in CACHE_DESCONVERTE):
+        conversas = [conversa_atual] + conversas
+
+    indice = le_indice()
+    CACHE_DESCONVERTE.update(indice)
+    resultado = [(c, desconverte_nome_mensagem(c)) for c in conversas]
+    if len(indice) < len(CACHE_DESCONVERTE):
+        escritor_arquivos().submit(salva_indice, dict(CACHE_DESCONVERTE))
+    return resultado
+
+
+@st.cache_data(ttl=3600, show_spinner=False)
+def carrega_conversa(nome_arquivo, mtime_ns):
+    """
+    Carrega as mensagens de uma conversa salva, guardando o resultado em cache.
+
+    Args:
+        - nome_arquivo (str): O nome do arquivo da conversa.
+        - mtime_ns (int): A data de modificação do arquivo. Faz parte da chave do cache
+        para que uma conversa alterada depois de carregada seja lida novamente.
+
     Returns:
-        list: Lista dos nomes das conversas ordenadas por data de modificação.
+        list: A lista de mensagens da conversa.
     """
-    conversas = list(PASTA_MENSAGENS.glob('*'))
-    conversas = sorted(conversas, key=lambda item: item.stat().st_mtime_ns, reverse=True)
-    return [c.stem for c in conversas]
+    return ler_mensagem_por_nome_arquivo(nome_arquivo, key='mensagem')
 
 
 def seleciona_conversa(nome_arquivo):
@@ -291,8 +640,9 @@ def seleciona_conversa(nome_arquivo):
     if not nome_arquivo:
         st.session_state['mensagens'] = []
     else:
-        mensagem = ler_mensagem_por_nome_arquivo(nome_arquivo, key='mensagem')
-        st.session_state['mensagens'] = mensagem
+        aguarda_gravacoes()
+        mtime_ns = (PASTA_MENSAGENS / nome_arquivo).stat().st_mtime_ns
+        st.session_state['mensagens'] = carrega_conversa(nome_arquivo, mtime_ns)
     st.session_state['conversa_atual'] = nome_arquivo
 
 
@@ -311,11 +661,11 @@ def tab_conversas(tab):
     tab.markdown('')
 
     conversas = listar_conversas()
-    for nome_arquivo in conversas:
-        nome_mensagem = desconverte_nome_mensagem(nome_arquivo).capitalize()
+    for nome_arquivo, nome_mensagem in conversas:
+        nome_mensagem = nome_mensagem.capitalize()
         if len(nome_mensagem) > 29:
             nome_mensagem += '...'
-        tab.button(desconverte_nome_mensagem(nome_arquivo).capitalize(),
+        tab.button(nome_mensagem,
                    on_click=seleciona_conversa,
                    args=(nome_arquivo,),
                    disabled=nome_arquivo==st.session_state['conversa_atual'],
@@ -349,6 +699,22 @@ def tab_configuracoes(tab):
         tab.success('Chave salva com sucesso')
 
 
+def chave_resposta(modelo, temperatura, mensagens):
+    """
+    Gera a chave do cache de respostas para uma requisição ao chat.
+
+    Args:
+        - modelo (str): O modelo da OpenAI usado.
+        - temperatura (float): A temperatura usada.
+        - mensagens (list): O histórico enviado, incluindo a última pergunta.
+
+    Returns:
+        bytes: Um hash de 16 bytes que identifica a requisição.
+    """
+    return hashlib.blake2b(repr((modelo, temperatura, mensagens)).encode(),
+                           digest_size=16).digest()
+
+
 def inicializacao():
     """
     Função que inicializa as variáveis de estado da sessão do Streamlit, se necessário.
@@ -365,6 +731,8 @@ def inicializacao():
         st.session_state.modelo = 'gpt-3.5-turbo'
     if 'api_key' not in st.session_state:
         st.session_state.api_key = le_chave()
+    if 'cache_respostas' not in st.session_state:
+        st.session_state.cache_respostas = OrderedDict()
 
 
 def pagina_principal():
@@ -373,7 +741,8 @@ def pagina_principal():
     o usuário e respostas do assistente.
 
     """
-    mensagens = ler_mensagens(st.session_state['mensagens'])
+    # Cópia: a sessão só recebe a nova pergunta junto com a resposta completa
+    mensagens = list(st.session_state['mensagens'])
 
     st.header('🤖 - Marini - Chatbot', divider=True)
 
@@ -391,23 +760,51 @@ def pagina_principal():
         chat = st.chat_message('assistant')
         placeholder = chat.empty()
         placeholder.markdown("▌")
-        resposta_completa = ''
-        respostas = chat_openai(st.session_state['api_key'],
-                                mensagens,
-                                modelo=st.session_state['modelo'],
-                                temperatura=st.session_state['temperatura_gpt'],
-                                stream=True)
-
-        for resposta in respostas:
-            if resposta.choices[0].delta.content:
-                resposta_completa += resposta.choices[0].delta.content
-            placeholder.markdown(resposta_completa + "▌")
+
+        cache_respostas = st.session_state['cache_respostas']
+        chave = chave_resposta(st.session_state['modelo'],
+                               st.session_state['temperatura_gpt'],
+                               mensagens)
+        if chave in cache_respostas:
+            cache_respostas.move_to_end(chave)
+            resposta_completa = cache_respostas[chave]
+        else:
+            partes_resposta = []
+            respostas = chat_openai(st.session_state['api_key'],
+                                    mensagens,
+                                    modelo=st.session_state['modelo'],
+                                    temperatura=st.session_state['temperatura_gpt'],
+                                    stream=True)
+
+            ultima_atualizacao = time.monotonic()
+            for resposta in respostas:
+                conteudo = resposta.choices[0].delta.content
+                if not conteudo:
+                    continue
+                partes_resposta.append(conteudo)
+                agora = time.monotonic()
+                if agora - ultima_atualizacao > INTERVALO_ATUALIZACAO or '\n' in conteudo:
+                    placeholder.markdown(''.join(partes_resposta) + "▌")
+                    ultima_atualizacao = agora
+            resposta_completa = ''.join(partes_resposta)
+
+            cache_respostas[chave] = resposta_completa
+            if len(cache_respostas) > TAMANHO_CACHE_RESPOSTAS:
+                cache_respostas.popitem(last=False)
         placeholder.markdown(resposta_completa)
         nova_mensagem = {'role': 'assistant', 'content': resposta_completa}
         mensagens.append(nova_mensagem)
 
         st.session_state['mensagens'] = mensagens
-        salvar_mensagens(mensagens)
+        nome_arquivo = st.session_state['conversa_atual']
+        if nome_arquivo:
+            acrescentar_turno(nome_arquivo, mensagens[-2:], mensagens=mensagens)
+        else:
+            # Primeiro turno de uma nova conversa: o nome é calculado uma única vez
+            nome_mensagem = retorna_nome_da_mensagem(mensagens)
+            nome_arquivo = converte_nome_mensagem(nome_mensagem)
+            if salvar_mensagens(mensagens, nome_mensagem=nome_mensagem, nome_arquivo=nome_arquivo):
+                st.session_state['conversa_atual'] = nome_arquivo
 
 
 if __name__ == '__main__':